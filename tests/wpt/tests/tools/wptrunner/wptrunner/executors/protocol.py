@@ -1,26 +1,59 @@
 # mypy: allow-untyped-defs
 
-import collections
-import traceback
-from http.client import HTTPConnection
-
-from abc import ABCMeta, abstractmethod
+import selectors
+import socket
+import sys
+from abc import abstractmethod
 from typing import Any, Awaitable, Callable, ClassVar, Dict, List, Mapping, Optional, \
-    Tuple, Type, TYPE_CHECKING, Union
+    Sequence, Tuple, Type, TYPE_CHECKING, Union, cast
 
 if TYPE_CHECKING:
     from webdriver.bidi.undefined import Undefined
 
 
+_MISSING = object()
+
+# Shared result for window_handles on connectionless protocols; callers only
+# iterate or index the handles, so one immutable empty tuple serves them all.
+_EMPTY_WINDOW_HANDLES: Tuple[str, ...] = ()
+
+# Imports cached by DebugProtocolPart.load_reftest_analyzer, which only runs
+# when debugging test failures; mozlog in particular is a heavy import that
+# shouldn't be paid on module load.
+_tbpl_formatter = None
+_quote_from_bytes = None
+_urljoin = None
+
+def _compile_phase_runner(phase: str, names: Sequence[str]) -> Callable[["Protocol"], None]:
+    """Generate a method calling `phase` on each part named in `names`.
+
+    The generated body is a straight line of `self.<name>.<phase>()` calls,
+    avoiding loop and sequence overhead for a part list that is fixed at
+    class-creation time."""
+    body = "".join(f"    self.{name}.{phase}()\n" for name in names) or "    pass\n"
+    namespace: Dict[str, Any] = {}
+    exec(f"def _do_{phase}(self):\n{body}", namespace)
+    return cast(Callable[["Protocol"], None], namespace[f"_do_{phase}"])
+
+
 def merge_dicts(target, source):
     if not (isinstance(target, dict) and isinstance(source, dict)):
         raise TypeError
-    for (key, source_value) in source.items():
-        if key not in target:
-            target[key] = source_value
-        else:
-            if isinstance(source_value, dict) and isinstance(target[key], dict):
-                merge_dicts(target[key], source_value)
+    # Nothing to merge; common when a test has no per-test overrides.
+    if not source:
+        return
+    # Iterate with an explicit stack rather than recursing so that deeply
+    # nested dicts don't pay a Python function call per level.
+    stack = [(target, source)]
+    while stack:
+        target, source = stack.pop()
+        target_get = target.get
+        for key, source_value in source.items():
+            target_value = target_get(key, _MISSING)
+            if target_value is _MISSING:
+                target[key] = source_value
+            elif type(source_value) is dict and type(target_value) is dict:
+                stack.append((target_value, source_value))
             else:
                 target[key] = source_value
 
@@ -35,18 +68,59 @@ class Protocol:
 
     :param Executor executor: The Executor instance that's using this Protocol
     :param Browser browser: The Browser using this protocol"""
-    __metaclass__ = ABCMeta
-
-    implements: ClassVar[List[Type["ProtocolPart"]]] = []
+    __slots__ = ("executor", "browser", "_parts")
+
+    implements: ClassVar[Sequence[Type["ProtocolPart"]]] = ()
+    _part_names: ClassVar[Tuple[str, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Flatten the declared part list once per class: dedupe by part name
+        # (first declaration wins, matching the manual filtering subclasses
+        # used to do) and store an immutable tuple that is cheap to iterate.
+        # The accessor names are resolved and interned here too, so the
+        # per-instance setattr/getattr hits the dict identity fast path.
+        by_name: Dict[str, Type["ProtocolPart"]] = {}
+        for part in cls.implements:
+            by_name.setdefault(part.name, part)
+        cls.implements = tuple(by_name.values())
+        cls._part_names = tuple(sys.intern(name) for name in by_name)
+        for phase in ("setup", "after_connect", "teardown"):
+            setattr(cls, f"_do_{phase}", _compile_phase_runner(phase, cls._part_names))
 
     def __init__(self, executor, browser):
         self.executor = executor
         self.browser = browser
 
-        for cls in self.implements:
-            name = cls.name
-            assert not hasattr(self, name)
-            setattr(self, name, cls(self))
+        if "implements" in self.__dict__:
+            # Some protocols (e.g. ChromeDriverProtocol) extend the part
+            # list per instance, so the class-level names don't apply.
+            names = tuple(sys.intern(cls.name) for cls in self.implements)
+            assert len(names) == len(set(names))
+        else:
+            names = self._part_names
+
+        parts = []
+        default_init = ProtocolPart.__init__
+        set_parent = ProtocolPart.parent.__set__
+        for cls, name in zip(self.implements, names):
+            if cls.__init__ is default_init:
+                # The default ProtocolPart.__init__ only stores the parent;
+                # write the slot directly and skip the call frame.
+                part = cls.__new__(cls)
+                set_parent(part, self)
+            else:
+                part = cls(self)
+            setattr(self, name, part)
+            parts.append(part)
+        self._parts = tuple(parts)
+
+        if "implements" in self.__dict__:
+            # The generated class-level phase runners don't cover
+            # instance-specific parts; fall back to the generic loops.
+            self._do_setup = self._loop_setup
+            self._do_after_connect = self._loop_after_connect
+            self._do_teardown = self._loop_teardown
 
     @property
     def logger(self):
@@ -69,45 +143,65 @@ class Protocol:
 
             msg = None
 
-            for cls in self.implements:
-                getattr(self, cls.name).setup()
+            self._do_setup()
 
             msg = "Post-connection steps failed"
             self.after_connect()
-            for cls in self.implements:
-                getattr(self, cls.name).after_connect()
+            self._do_after_connect()
         except Exception:
-            message = "Protocol.setup caught an exception:\n"
-            message += f"{msg}\n" if msg is not None else ""
-            message += traceback.format_exc()
-            self.logger.warning(message)
+            message = "Protocol.setup caught an exception:"
+            if msg is not None:
+                message += f"\n{msg}"
+            # The logger formats the traceback from sys.exc_info() itself.
+            self.logger.warning(message, exc_info=True)
             raise
 
     @abstractmethod
     def connect(self):
         """Make a connection to the remote browser"""
-        pass
 
     @abstractmethod
     def after_connect(self):
         """Run any post-connection steps. This happens after the ProtocolParts are
         initalized so can depend on a fully-populated object."""
-        pass
 
     def teardown(self):
         """Run cleanup steps after the tests are finished."""
-        for cls in self.implements:
-            getattr(self, cls.name).teardown()
+        self._do_teardown()
+
+    def _loop_setup(self):
+        for part in self._parts:
+            part.setup()
+
+    def _loop_after_connect(self):
+        for part in self._parts:
+            part.after_connect()
+
+    def _loop_teardown(self):
+        for part in self._parts:
+            part.teardown()
+
+    # Subclasses get straight-line runners generated in __init_subclass__.
+    _do_setup = _loop_setup
+    _do_after_connect = _loop_after_connect
+    _do_teardown = _loop_teardown
 
 
 class ProtocolPart:
     """Base class  for all ProtocolParts.
 
     :param Protocol parent: The parent protocol"""
-    __metaclass__ = ABCMeta
+    __slots__ = ("parent",)
 
     name: ClassVar[str]
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Part names end up as instance-dict keys on every Protocol;
+        # interning makes those hashes and comparisons pointer operations.
+        if "name" in cls.__dict__:
+            cls.name = sys.intern(cls.name)
+
     def __init__(self, parent):
         self.parent = parent
 
@@ -118,22 +212,18 @@ class ProtocolPart:
 
     def setup(self):
         """Run any setup steps required for the ProtocolPart."""
-        pass
 
     def after_connect(self):
         """Run any post-connection steps. This happens after the ProtocolParts are
         initalized so can depend on a fully-populated object."""
-        pass
 
     def teardown(self):
         """Run any teardown steps required for the ProtocolPart."""
-        pass
 
 
 class BaseProtocolPart(ProtocolPart):
     """Generic bits of protocol that are required for multiple test types"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "base"
 
     @abstractmethod
@@ -146,21 +236,18 @@ class BaseProtocolPart(ProtocolPart):
                            the initial function call or if it waits for some callback.
         :returns: The result of the script execution.
         """
-        pass
 
     @abstractmethod
     def set_timeout(self, timeout):
         """Set the timeout for script execution.
 
         :param timeout: Script timeout in seconds"""
-        pass
 
     @abstractmethod
     def wait(self):
         """Wait indefinitely for the browser to close.
 
         :returns: True to re-run the test, or False to continue with the next test"""
-        pass
 
     @abstractmethod
     def create_window(self, type="tab", **kwargs):
@@ -168,14 +255,12 @@ class BaseProtocolPart(ProtocolPart):
 
         :param type: - Type hint, either "tab" or "window"
         :returns: A protocol-specific handle"""
-        pass
 
     @property
     def current_window(self):
         """Return a handle identifying the current top level browsing context
 
         :returns: A protocol-specific handle"""
-        pass
 
     @abstractmethod
     def set_window(self, handle):
@@ -183,25 +268,20 @@ class BaseProtocolPart(ProtocolPart):
 
         :param handle: A protocol-specific handle identifying a top level browsing
                        context."""
-        pass
 
     @abstractmethod
     def window_handles(self):
         """Get a list of handles to top-level browsing contexts"""
-        pass
 
     @abstractmethod
     def load(self, url):
         """Load a url in the current browsing context
 
         :param url: The url to load"""
-        pass
 
 
 class TestharnessProtocolPart(ProtocolPart):
     """Protocol part required to run testharness tests."""
-    __metaclass__ = ABCMeta
-
     name = "testharness"
 
     @abstractmethod
@@ -210,7 +290,6 @@ class TestharnessProtocolPart(ProtocolPart):
 
         :param str url_protocol: "https" or "http" depending on the test metadata.
         """
-        pass
 
     @abstractmethod
     def close_old_windows(self, url_protocol):
@@ -221,7 +300,6 @@ class TestharnessProtocolPart(ProtocolPart):
         :param str url_protocol: "https" or "http" depending on the test metadata.
         :returns: A browser-specific handle to the runner page.
         """
-        pass
 
     @abstractmethod
     def test_window_loaded(self):
@@ -230,8 +308,6 @@ class TestharnessProtocolPart(ProtocolPart):
 
 class PrefsProtocolPart(ProtocolPart):
     """Protocol part that allows getting and setting browser prefs."""
-    __metaclass__ = ABCMeta
-
     name = "prefs"
 
     @abstractmethod
@@ -240,7 +316,6 @@ class PrefsProtocolPart(ProtocolPart):
 
         :param name: A pref name of browser-specific type
         :param value: A pref value of browser-specific type"""
-        pass
 
     @abstractmethod
     def get(self, name):
@@ -248,20 +323,16 @@ class PrefsProtocolPart(ProtocolPart):
 
         :param name: A pref name of browser-specific type
         :returns: A pref value of browser-specific type"""
-        pass
 
     @abstractmethod
     def clear(self, name):
         """Reset the value of a named pref back to the default.
 
         :param name: A pref name of browser-specific type"""
-        pass
 
 
 class StorageProtocolPart(ProtocolPart):
     """Protocol part for manipulating browser storage."""
-    __metaclass__ = ABCMeta
-
     name = "storage"
 
     @abstractmethod
@@ -269,28 +340,28 @@ class StorageProtocolPart(ProtocolPart):
         """Clear all the storage for a specified origin.
 
         :param url: A url belonging to the origin"""
-        pass
 
     @abstractmethod
     def run_bounce_tracking_mitigations(self):
         """Run the Bounce Tracking Mitigations deletion/enforcement algorithm
 
         :returns: A list of sites corresponding to bounce trackers whose state was removed"""
-        pass
 
 class SelectorProtocolPart(ProtocolPart):
     """Protocol part for selecting elements on the page."""
-    __metaclass__ = ABCMeta
-
     name = "select"
 
     def element_by_selector(self, element_selector):
         elements = self.elements_by_selector(element_selector)
-        if len(elements) == 0:
-            raise ValueError(f"Selector '{element_selector}' matches no elements")
-        elif len(elements) > 1:
-            raise ValueError(f"Selector '{element_selector}' matches multiple elements")
-        return elements[0]
+        try:
+            # Unpacking succeeds exactly when one element matched; the
+            # common case pays no len() checks.
+            (element,) = elements
+        except ValueError:
+            if not elements:
+                raise ValueError(f"Selector '{element_selector}' matches no elements") from None
+            raise ValueError(f"Selector '{element_selector}' matches multiple elements") from None
+        return element
 
     @abstractmethod
     def elements_by_selector(self, selector):
@@ -298,13 +369,10 @@ class SelectorProtocolPart(ProtocolPart):
 
         :param str selector: The CSS selector
         :returns: A list of protocol-specific handles to elements"""
-        pass
 
 
 class ClickProtocolPart(ProtocolPart):
     """Protocol part for performing trusted clicks"""
-    __metaclass__ = ABCMeta
-
     name = "click"
 
     @abstractmethod
@@ -312,13 +380,10 @@ class ClickProtocolPart(ProtocolPart):
         """Perform a trusted click somewhere on a specific element.
 
         :param element: A protocol-specific handle to an element."""
-        pass
 
 
 class AccessibilityProtocolPart(ProtocolPart):
     """Protocol part for accessibility introspection"""
-    __metaclass__ = ABCMeta
-
     name = "accessibility"
 
     @abstractmethod
@@ -326,19 +391,15 @@ class AccessibilityProtocolPart(ProtocolPart):
         """Return the computed accessibility label for a specific element.
 
         :param element: A protocol-specific handle to an element."""
-        pass
 
     def get_computed_role(self, element):
         """Return the computed accessibility role for a specific element.
 
         :param element: A protocol-specific handle to an element."""
-        pass
 
 
 class WebExtensionsProtocolPart(ProtocolPart):
     """Protocol part for managing WebExtensions"""
-    __metaclass__ = ABCMeta
-
     name = "web_extensions"
 
     @abstractmethod
@@ -352,7 +413,6 @@ class WebExtensionsProtocolPart(ProtocolPart):
 
 class BidiBluetoothProtocolPart(ProtocolPart):
     """Protocol part for managing BiDi events"""
-    __metaclass__ = ABCMeta
     name = "bidi_bluetooth"
 
     @abstractmethod
@@ -369,7 +429,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param accept: Whether to accept a bluetooth device prompt.
         :param device: The device id from a bluetooth device prompt to be accepted.
         """
-        pass
 
     @abstractmethod
     async def simulate_adapter(self,
@@ -380,7 +439,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param context: Browsing context to set the simulated adapter to.
         :param state: The state of the simulated bluetooth adapter.
         """
-        pass
 
     @abstractmethod
     async def disable_simulation(self,
@@ -389,7 +447,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         Disables bluetooth simulation.
         :param context: Browsing context to disable the simulation for.
         """
-        pass
 
     @abstractmethod
     async def simulate_preconnected_peripheral(self,
@@ -406,7 +463,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param manufacturer_data: The manufacturer data of the simulated bluetooth peripheral.
         :param known_service_uuids: The known service uuids of the simulated bluetooth peripheral.
         """
-        pass
 
     @abstractmethod
     async def simulate_gatt_connection_response(self,
@@ -419,7 +475,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param address: The address of the simulated bluetooth peripheral.
         :param code: The GATT connection response code of the simulated bluetooth peripheral.
         """
-        pass
 
     @abstractmethod
     async def simulate_gatt_disconnection(self,
@@ -430,7 +485,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param context: Browsing context to set the simulated peripheral to.
         :param address: The address of the simulated bluetooth peripheral.
         """
-        pass
 
     @abstractmethod
     async def simulate_service(self,
@@ -445,7 +499,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param uuid: The uuid of the simulated GATT service.
         :param type: The type of the GATT service simulation, either add or remove.
         """
-        pass
 
     @abstractmethod
     async def simulate_characteristic(self,
@@ -464,7 +517,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param characteristic_properties: The properties of the simulated GATT characteristic.
         :param type: The type of the GATT characterisitc simulation, either add or remove.
         """
-        pass
 
     @abstractmethod
     async def simulate_characteristic_response(self,
@@ -485,7 +537,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param code: The simulated GATT characteristic response code.
         :param data: The data along with the simulated GATT characteristic response.
         """
-        pass
 
     @abstractmethod
     async def simulate_descriptor(self,
@@ -504,7 +555,6 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param descriptor_uuid: The uuid of the simulated GATT descriptor.
         :param type: The type of the GATT descriptor simulation, either add or remove.
         """
-        pass
 
     @abstractmethod
     async def simulate_descriptor_response(self,
@@ -527,11 +577,9 @@ class BidiBluetoothProtocolPart(ProtocolPart):
         :param code: The simulated GATT descriptor response code.
         :param data: The data along with the simulated GATT descriptor response.
         """
-        pass
 
 class BidiBrowsingContextProtocolPart(ProtocolPart):
     """Protocol part for managing BiDi events"""
-    __metaclass__ = ABCMeta
     name = "bidi_browsing_context"
 
     @abstractmethod
@@ -545,12 +593,10 @@ class BidiBrowsingContextProtocolPart(ProtocolPart):
         :param accept: Whether to accept or dismiss the prompt.
         :param user_text: The text to input in the prompt.
         """
-        pass
 
 
 class BidiEventsProtocolPart(ProtocolPart):
     """Protocol part for managing BiDi events"""
-    __metaclass__ = ABCMeta
     name = "bidi_events"
 
     @abstractmethod
@@ -562,7 +608,6 @@ class BidiEventsProtocolPart(ProtocolPart):
         :param events: The events to subscribe to.
         :param contexts: The contexts to subscribe to. If None, the function will subscribe to all contexts.
         """
-        pass
 
     @abstractmethod
     async def unsubscribe(self, subscriptions: List[str]) -> Mapping[str, Any]:
@@ -570,12 +615,10 @@ class BidiEventsProtocolPart(ProtocolPart):
         Unsubscribes from the subscriptions with the given IDs.
         :param subscriptions: The list of subscription ids to unsubscribe from.
         """
-        pass
 
     @abstractmethod
     async def unsubscribe_all(self):
         """Cleans up the subscription state. Removes all the previously added subscriptions."""
-        pass
 
     @abstractmethod
     def add_event_listener(
@@ -585,15 +628,67 @@ class BidiEventsProtocolPart(ProtocolPart):
     ) -> Callable[[], None]:
         """Add an event listener. The callback will be called with the event name and the event data.
 
+        Implementations that keep their own listener table should use
+        BidiEventListenerMixin, which stores listeners in a layout chosen
+        for dispatch speed.
+
         :param name: The name of the event to listen for. If None, the function will be called for all events.
         :param fn: The function to call when the event is received.
         :return: Function to remove the added listener."""
-        pass
+
+
+class BidiEventListenerMixin:
+    """Listener table for BidiEventsProtocolPart implementations.
+
+    Listeners are stored as a dict of per-event tuples plus a tuple of
+    wildcard listeners, so dispatching an event is two lookups and tuple
+    iteration with no allocation. The tuples are rebuilt on add/remove;
+    listener churn is rare compared to event dispatch."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._listeners_by_name: Dict[str, Tuple[Callable[..., Awaitable[Any]], ...]] = {}
+        self._wildcard_listeners: Tuple[Callable[..., Awaitable[Any]], ...] = ()
+
+    def add_event_listener(
+            self,
+            name: Optional[str],
+            fn: Callable[[str, Mapping[str, Any]], Awaitable[Any]]
+    ) -> Callable[[], None]:
+        """Add an event listener and return a callable that removes it again.
+
+        :param name: The name of the event to listen for. If None, the function will be called for all events.
+        :param fn: The function to call when the event is received."""
+        if name is None:
+            self._wildcard_listeners += (fn,)
+        else:
+            table = self._listeners_by_name
+            table[name] = table.get(name, ()) + (fn,)
+
+        def remove_listener():
+            if name is None:
+                self._wildcard_listeners = tuple(
+                    listener for listener in self._wildcard_listeners if listener is not fn)
+            else:
+                remaining = tuple(
+                    listener for listener in self._listeners_by_name[name] if listener is not fn)
+                if remaining:
+                    self._listeners_by_name[name] = remaining
+                else:
+                    del self._listeners_by_name[name]
+
+        return remove_listener
+
+    async def dispatch_event(self, name: str, data: Mapping[str, Any]) -> None:
+        """Call every listener registered for `name`, wildcard listeners first."""
+        for fn in self._wildcard_listeners:
+            await fn(name, data)
+        for fn in self._listeners_by_name.get(name, ()):
+            await fn(name, data)
 
 
 class BidiPermissionsProtocolPart(ProtocolPart):
     """Protocol part for managing BiDi events"""
-    __metaclass__ = ABCMeta
     name = "bidi_permissions"
 
     @abstractmethod
@@ -603,7 +698,6 @@ class BidiPermissionsProtocolPart(ProtocolPart):
 
 class BidiEmulationProtocolPart(ProtocolPart):
     """Protocol part for emulation"""
-    __metaclass__ = ABCMeta
     name = "bidi_emulation"
 
     @abstractmethod
@@ -627,8 +721,6 @@ class BidiEmulationProtocolPart(ProtocolPart):
 
 class BidiScriptProtocolPart(ProtocolPart):
     """Protocol part for executing BiDi scripts"""
-    __metaclass__ = ABCMeta
-
     name = "bidi_script"
 
     @abstractmethod
@@ -645,37 +737,29 @@ class BidiScriptProtocolPart(ProtocolPart):
         :param script.Target target: The target in which to execute the script.
         :param list[script.LocalValue] arguments: The arguments to pass to the script.
         """
-        pass
 
 
 class CookiesProtocolPart(ProtocolPart):
     """Protocol part for managing cookies"""
-    __metaclass__ = ABCMeta
-
     name = "cookies"
 
     @abstractmethod
     def delete_all_cookies(self):
         """Delete all cookies."""
-        pass
 
     @abstractmethod
     def get_all_cookies(self):
         """Get all cookies."""
-        pass
 
     @abstractmethod
     def get_named_cookie(self, name):
         """Get named cookie.
 
         :param name: The name of the cookie to get."""
-        pass
 
 
 class SendKeysProtocolPart(ProtocolPart):
     """Protocol part for performing trusted clicks"""
-    __metaclass__ = ABCMeta
-
     name = "send_keys"
 
     @abstractmethod
@@ -684,33 +768,25 @@ class SendKeysProtocolPart(ProtocolPart):
 
         :param element: A protocol-specific handle to an element.
         :param keys: A protocol-specific handle to a string of input keys."""
-        pass
 
 class WindowProtocolPart(ProtocolPart):
     """Protocol part for manipulating the window"""
-    __metaclass__ = ABCMeta
-
     name = "window"
 
     @abstractmethod
     def set_rect(self, rect):
         """Restores the window to the given rect."""
-        pass
 
     @abstractmethod
     def get_rect(self):
         """Gets the current window rect."""
-        pass
 
     @abstractmethod
     def minimize(self):
         """Minimizes the window and returns the previous rect."""
-        pass
 
 class GenerateTestReportProtocolPart(ProtocolPart):
     """Protocol part for generating test reports"""
-    __metaclass__ = ABCMeta
-
     name = "generate_test_report"
 
     @abstractmethod
@@ -718,13 +794,10 @@ class GenerateTestReportProtocolPart(ProtocolPart):
         """Generate a test report.
 
         :param message: The message to be contained in the report."""
-        pass
 
 
 class SetPermissionProtocolPart(ProtocolPart):
     """Protocol part for setting permissions"""
-    __metaclass__ = ABCMeta
-
     name = "set_permission"
 
     @abstractmethod
@@ -733,13 +806,10 @@ class SetPermissionProtocolPart(ProtocolPart):
 
         :param descriptor: A PermissionDescriptor object.
         :param state: The state to set the permission to."""
-        pass
 
 
 class ActionSequenceProtocolPart(ProtocolPart):
     """Protocol part for performing trusted clicks"""
-    __metaclass__ = ABCMeta
-
     name = "action_sequence"
 
     @abstractmethod
@@ -747,17 +817,28 @@ class ActionSequenceProtocolPart(ProtocolPart):
         """Send a sequence of actions to the window.
 
         :param actions: A protocol-specific handle to an array of actions."""
-        pass
 
     def release(self):
         pass
 
 
+# Opcodes for the switch_to_window traversal stack.
+_OP_SET_WINDOW = 0
+_OP_SWITCH_FRAME = 1
+_OP_PARENT_FRAME = 2
+
+# Gets the window id and a list of elements containing nested browsing contexts.
+# For embed we can't tell for sure if there's a nested browsing context, so always
+# return it and fail later if there isn't.
+_FRAME_ENUM_SCRIPT = """
+let contextParents = Array.from(document.querySelectorAll("frame, iframe, embed, object"))
+    .filter(elem => elem.localName !== "embed" ? (elem.contentWindow !== null) : true);
+return [window.__wptrunner_id, contextParents]"""
+
+
 class TestDriverProtocolPart(ProtocolPart):
     """Protocol part that implements the basic functionality required for
     all testdriver-based tests."""
-    __metaclass__ = ABCMeta
-
     name = "testdriver"
 
     @abstractmethod
@@ -769,7 +850,6 @@ class TestDriverProtocolPart(ProtocolPart):
         :param str status: Either "failure" or "success" depending on whether the
                            previous command succeeded.
         :param str message: Additional data to add to the message."""
-        pass
 
     def switch_to_window(self, wptrunner_id, initial_window=None):
         """Switch to a window given a wptrunner window id
@@ -779,39 +859,50 @@ class TestDriverProtocolPart(ProtocolPart):
         if wptrunner_id is None:
             return
 
-        if initial_window is None:
-            initial_window = self.parent.base.current_window
+        base = self.parent.base
 
-        stack = [str(item) for item in self.parent.base.window_handles()]
+        if initial_window is None:
+            initial_window = base.current_window
+
+        # Bind the methods used in the loop once rather than re-walking the
+        # parent/base attribute chain per frame.
+        set_window = base.set_window
+        execute_script = base.execute_script
+        switch_to_frame = self._switch_to_frame
+        switch_to_parent_frame = self._switch_to_parent_frame
+
+        # Parallel stacks of small-int opcodes and their arguments; comparing
+        # ints is cheaper than discriminating the mixed handle/element/marker
+        # values by type on every iteration.
+        op_stack = []
+        arg_stack = []
+        for item in base.window_handles():
+            op_stack.append(_OP_SET_WINDOW)
+            arg_stack.append(str(item))
         first = True
-        while stack:
-            item = stack.pop()
+        while op_stack:
+            op = op_stack.pop()
+            item = arg_stack.pop()
 
-            if item is None:
+            if op == _OP_PARENT_FRAME:
                 assert first is False
-                self._switch_to_parent_frame()
+                switch_to_parent_frame()
                 continue
 
-            if isinstance(item, str):
+            if op == _OP_SET_WINDOW:
                 if not first or item != initial_window:
-                    self.parent.base.set_window(item)
+                    set_window(item)
                 first = False
             else:
                 assert first is False
                 try:
-                    self._switch_to_frame(item)
+                    switch_to_frame(item)
                 except ValueError:
                     # The frame no longer exists, or doesn't have a nested browsing context, so continue
                     continue
 
             try:
-                # Get the window id and a list of elements containing nested browsing contexts.
-                # For embed we can't tell fpr sure if there's a nested browsing context, so always return it
-                # and fail later if there isn't
-                result = self.parent.base.execute_script("""
-                let contextParents = Array.from(document.querySelectorAll("frame, iframe, embed, object"))
-                    .filter(elem => elem.localName !== "embed" ? (elem.contentWindow !== null) : true);
-                return [window.__wptrunner_id, contextParents]""")
+                result = execute_script(_FRAME_ENUM_SCRIPT)
             except Exception:
                 continue
 
@@ -826,9 +917,11 @@ class TestDriverProtocolPart(ProtocolPart):
                 return
 
             for elem in reversed(nested_context_containers):
-                # None here makes us switch back to the parent after we've processed the frame
-                stack.append(None)
-                stack.append(elem)
+                # The parent-frame op makes us switch back up after we've processed the frame
+                op_stack.append(_OP_PARENT_FRAME)
+                arg_stack.append(None)
+                op_stack.append(_OP_SWITCH_FRAME)
+                arg_stack.append(elem)
 
         raise Exception("Window with id %s not found" % wptrunner_id)
 
@@ -837,36 +930,36 @@ class TestDriverProtocolPart(ProtocolPart):
         """Switch to a frame in the current window
 
         :param int index_or_elem: Frame id or container element"""
-        pass
 
     @abstractmethod
     def _switch_to_parent_frame(self):
         """Switch to the parent of the current frame"""
-        pass
 
 
 class AssertsProtocolPart(ProtocolPart):
     """ProtocolPart that implements the functionality required to get a count of non-fatal
     assertions triggered"""
-    __metaclass__ = ABCMeta
-
     name = "asserts"
 
     @abstractmethod
     def get(self):
         """Get a count of assertions since the last browser start"""
-        pass
 
 
 class LeakProtocolPart(ProtocolPart):
     """Protocol part that checks for leaked DOM objects."""
-    __metaclass__ = ABCMeta
-
     name = "leak"
 
+    # Interned so downstream identity comparisons on the URL stay cheap.
+    _BLANK = sys.intern("about:blank")
+
     def after_connect(self):
-        self.parent.base.load("about:blank")
-        self.expected_counters = collections.Counter(self.get_counters())
+        # check() runs per test, so bind the blank-page loader once rather
+        # than walking parent.base.load on every call.
+        self._load = self.parent.base.load
+        self._load(self._BLANK)
+        # A plain dict copy is enough; check() only does defaulted lookups.
+        self.expected_counters = dict(self.get_counters())
 
     @abstractmethod
     def get_counters(self) -> Mapping[str, int]:
@@ -876,40 +969,52 @@ class LeakProtocolPart(ProtocolPart):
         """Check for DOM objects that outlive the current page.
 
         Returns:
-            A map from object type to (expected, actual) counts, if one or more
-            types leaked. Otherwise, `None`.
+            A map from each leaked object type to its (expected, actual)
+            counts, if one or more types leaked. Otherwise, `None`.
         """
-        self.parent.base.load("about:blank")
-        counters = collections.Counter(self.get_counters())
-        if counters - self.expected_counters:
-            return {
-                name: (self.expected_counters[name], counters[name])
-                for name in set(counters) | set(self.expected_counters)
-            }
-        return None
+        self._load(self._BLANK)
+        expected_get = self.expected_counters.get
+        # Only types whose count grew are leaks; reporting the full union of
+        # names would just pad the result with unchanged counters. A single
+        # pass over the live counts builds the report directly.
+        leaked = {name: (expected_get(name, 0), count)
+                  for name, count in self.get_counters().items()
+                  if count > expected_get(name, 0)}
+        return leaked or None
 
 
 class CoverageProtocolPart(ProtocolPart):
     """Protocol part for collecting per-test coverage data."""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "coverage"
 
     @abstractmethod
     def reset(self):
         """Reset coverage counters"""
-        pass
 
     @abstractmethod
     def dump(self):
         """Dump coverage counters"""
-        pass
+
+
+# Every authenticator method below documents the same first parameter;
+# composing the docstrings from one shared template keeps a single copy of
+# the repeated text in the module.
+_AUTHN_ID_PARAM = ":param str authenticator_id: The ID of the authenticator"
+
+
+def _authn_abstract(desc: str, extra: str = "") -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Mark a method abstract with a docstring built from `desc`, the shared
+    authenticator_id parameter doc and any `extra` continuation text."""
+    def wrap(f: Callable[..., Any]) -> Callable[..., Any]:
+        f.__doc__ = "%s\n\n        %s%s" % (desc, _AUTHN_ID_PARAM, extra)
+        return abstractmethod(f)
+    return wrap
 
 
 class VirtualAuthenticatorProtocolPart(ProtocolPart):
     """Protocol part for creating and manipulating virtual authenticators"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "virtual_authenticator"
 
     @abstractmethod
@@ -917,59 +1022,40 @@ class VirtualAuthenticatorProtocolPart(ProtocolPart):
         """Add a virtual authenticator
 
         :param config: The Authenticator Configuration"""
-        pass
 
-    @abstractmethod
+    @_authn_abstract("Remove a virtual authenticator", " to remove")
     def remove_virtual_authenticator(self, authenticator_id):
-        """Remove a virtual authenticator
-
-        :param str authenticator_id: The ID of the authenticator to remove"""
         pass
 
-    @abstractmethod
+    @_authn_abstract("Inject a credential onto an authenticator",
+                     " to add the credential to\n"
+                     "        :param credential: The credential to inject")
     def add_credential(self, authenticator_id, credential):
-        """Inject a credential onto an authenticator
-
-        :param str authenticator_id: The ID of the authenticator to add the credential to
-        :param credential: The credential to inject"""
         pass
 
-    @abstractmethod
+    @_authn_abstract("Get the credentials stored in an authenticator",
+                     "\n        :returns: An array with the credentials stored on the authenticator")
     def get_credentials(self, authenticator_id):
-        """Get the credentials stored in an authenticator
-
-        :param str authenticator_id: The ID of the authenticator
-        :returns: An array with the credentials stored on the authenticator"""
         pass
 
-    @abstractmethod
+    @_authn_abstract("Remove a credential stored in an authenticator",
+                     "\n        :param str credential_id: The ID of the credential")
     def remove_credential(self, authenticator_id, credential_id):
-        """Remove a credential stored in an authenticator
-
-        :param str authenticator_id: The ID of the authenticator
-        :param str credential_id: The ID of the credential"""
         pass
 
-    @abstractmethod
+    @_authn_abstract("Remove all the credentials stored in an authenticator")
     def remove_all_credentials(self, authenticator_id):
-        """Remove all the credentials stored in an authenticator
-
-        :param str authenticator_id: The ID of the authenticator"""
         pass
 
-    @abstractmethod
+    @_authn_abstract("Sets the user verified flag on an authenticator",
+                     "\n        :param bool uv: the user verified flag")
     def set_user_verified(self, authenticator_id, uv):
-        """Sets the user verified flag on an authenticator
-
-        :param str authenticator_id: The ID of the authenticator
-        :param bool uv: the user verified flag"""
         pass
 
 
 class SPCTransactionsProtocolPart(ProtocolPart):
     """Protocol part for Secure Payment Confirmation transactions"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "spc_transactions"
 
     @abstractmethod
@@ -977,12 +1063,10 @@ class SPCTransactionsProtocolPart(ProtocolPart):
         """Set the SPC transaction automation mode
 
         :param str mode: The automation mode to set"""
-        pass
 
 class RPHRegistrationsProtocolPart(ProtocolPart):
     """Protocol part for Custom Handlers registrations"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "rph_registrations"
 
     @abstractmethod
@@ -990,103 +1074,115 @@ class RPHRegistrationsProtocolPart(ProtocolPart):
         """Set the RPH registration automation mode
 
         :param str mode: The automation mode to set"""
-        pass
 
 class FedCMProtocolPart(ProtocolPart):
     """Protocol part for Federated Credential Management"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "fedcm"
 
     @abstractmethod
     def cancel_fedcm_dialog(self):
         """Cancel the FedCM dialog"""
-        pass
 
     @abstractmethod
     def click_fedcm_dialog_button(self, dialog_button):
         """Click a button on the FedCM dialog
 
         :param str dialog_button: The dialog button to click"""
-        pass
 
     @abstractmethod
     def select_fedcm_account(self, account_index):
         """Select a FedCM account
 
         :param int account_index: The index of the account to select"""
-        pass
 
     @abstractmethod
     def get_fedcm_account_list(self):
         """Get the FedCM account list"""
-        pass
 
     @abstractmethod
     def get_fedcm_dialog_title(self):
         """Get the FedCM dialog title"""
-        pass
 
     @abstractmethod
     def get_fedcm_dialog_type(self):
         """Get the FedCM dialog type"""
-        pass
 
     @abstractmethod
     def set_fedcm_delay_enabled(self, enabled):
         """Sets the FedCM delay as enabled or disabled
 
         :param bool enabled: The delay to set"""
-        pass
 
     @abstractmethod
     def reset_fedcm_cooldown(self):
         """Set the FedCM cooldown"""
-        pass
 
 
 class PrintProtocolPart(ProtocolPart):
     """Protocol part for rendering to a PDF."""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "pdf_print"
 
     @abstractmethod
     def render_as_pdf(self, width, height):
         """Output document as PDF"""
-        pass
 
 
 class DebugProtocolPart(ProtocolPart):
     """Protocol part for debugging test failures."""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ("_analyzer_base",)
     name = "debug"
 
     @abstractmethod
     def load_devtools(self):
         """Load devtools in the current window"""
-        pass
-
-    def load_reftest_analyzer(self, test, result):
-        import io
-        import mozlog
-        from urllib.parse import quote, urljoin
 
-        debug_test_logger = mozlog.structuredlog.StructuredLogger("debug_test")
-        output = io.StringIO()
-        debug_test_logger.suite_start([])
-        debug_test_logger.add_handler(mozlog.handlers.StreamHandler(output, formatter=mozlog.formatters.TbplFormatter()))
-        debug_test_logger.test_start(test.id)
-        # Always use PASS as the expected value so we get output even for expected failures
-        debug_test_logger.test_end(test.id, result["status"], "PASS", extra=result.get("extra"))
+    def _analyzer_base_url(self):
+        """The reftest analyzer URL up to the log fragment, computed once
+        and cached so repeated failures only pay a string concatenation."""
+        url = getattr(self, "_analyzer_base", None)
+        if url is None:
+            url = self._analyzer_base = _urljoin(
+                self.parent.executor.server_url("https"),
+                "/common/third_party/reftest-analyzer.xhtml#log=")
+        return url
 
-        self.parent.base.load(urljoin(self.parent.executor.server_url("https"),
-                              "/common/third_party/reftest-analyzer.xhtml#log=%s" %
-                               quote(output.getvalue())))
+    def load_reftest_analyzer(self, test, result):
+        global _tbpl_formatter, _quote_from_bytes, _urljoin
+        if _tbpl_formatter is None:
+            from mozlog.formatters import TbplFormatter
+            from urllib.parse import quote_from_bytes, urljoin
+            _tbpl_formatter, _quote_from_bytes, _urljoin = TbplFormatter, quote_from_bytes, urljoin
+
+        # Format the single result directly rather than routing it through a
+        # StructuredLogger/StreamHandler pipeline, which would pay logger
+        # state, handler dispatch and timestamping for a one-shot payload.
+        # The events mirror what the logger would emit: "expected" is only
+        # present on unexpected results, using PASS as the expected value so
+        # we get output even for expected failures.
+        test_end = {"action": "test_end", "test": test.id,
+                    "status": result["status"], "time": 0}
+        if result["status"] not in ("PASS", "SKIP"):
+            test_end["expected"] = "PASS"
+        if result.get("extra") is not None:
+            test_end["extra"] = result["extra"]
+        events = [
+            {"action": "test_start", "test": test.id, "time": 0},
+            test_end,
+        ]
+        formatter = _tbpl_formatter()
+        log = "".join(formatter(event) or "" for event in events)
+
+        # Encode the whole log once and percent-encode at the byte level,
+        # which is cheaper than quote()'s per-codepoint path for large logs.
+        quoted_log = _quote_from_bytes(log.encode("utf-8"), safe="/")
+        self.parent.base.load(self._analyzer_base_url() + quoted_log)
 
 
 class ConnectionlessBaseProtocolPart(BaseProtocolPart):
+    __slots__ = ()
+
     def load(self, url):
         pass
 
@@ -1103,7 +1199,7 @@ class ConnectionlessBaseProtocolPart(BaseProtocolPart):
         pass
 
     def window_handles(self):
-        return []
+        return _EMPTY_WINDOW_HANDLES
 
 
 class ConnectionlessProtocol(Protocol):
@@ -1119,9 +1215,6 @@ class ConnectionlessProtocol(Protocol):
 class WdspecProtocol(ConnectionlessProtocol):
     implements = [ConnectionlessBaseProtocolPart]
 
-    def __init__(self, executor, browser):
-        super().__init__(executor, browser)
-
     def is_alive(self):
         """Test that the connection is still alive.
 
@@ -1132,20 +1225,93 @@ class WdspecProtocol(ConnectionlessProtocol):
 
         An HTTP request to an invalid path that results in a 404 is
         proof enough to us that the server is alive and kicking.
+
+        The request is written to a raw socket: only the status code
+        matters, so there is no need to assemble headers and parse a
+        full response through http.client.
         """
-        conn = HTTPConnection(self.browser.host, self.browser.port)
+        host, port = self.browser.host, self.browser.port
         try:
-            conn.request("HEAD", "/invalid")
-            res = conn.getresponse()
-            return res.status == 404
+            with socket.create_connection((host, port), timeout=5) as sock:
+                sock.sendall(b"HEAD /invalid HTTP/1.0\r\nHost: %s\r\n\r\n" %
+                             host.encode("ascii"))
+                # The reply starts "HTTP/1.x NNN"; twelve bytes cover the
+                # status code.
+                data = b""
+                while len(data) < 12:
+                    chunk = sock.recv(12 - len(data))
+                    if not chunk:
+                        break
+                    data += chunk
         except OSError:
             return False
+        return data[9:12] == b"404"
+
+    @classmethod
+    def are_alive(cls, protocols):
+        """Check the liveness of several protocol instances at once.
+
+        Issues the same 404 probe as :meth:`is_alive` to every remote
+        concurrently and waits for all the responses together, so checking
+        N browsers costs roughly one network round-trip rather than N.
+
+        :param protocols: List of WdspecProtocol instances to check.
+        :returns: List of booleans, one per protocol, in the same order.
+        """
+        if len(protocols) <= 1:
+            # A single check gains nothing from multiplexing.
+            return [protocol.is_alive() for protocol in protocols]
+
+        results = [False] * len(protocols)
+        buffers = [b""] * len(protocols)
+        selector = selectors.DefaultSelector()
+        sockets = []
+        try:
+            for index, protocol in enumerate(protocols):
+                host, port = protocol.browser.host, protocol.browser.port
+                try:
+                    sock = socket.create_connection((host, port), timeout=5)
+                    sockets.append(sock)
+                    request = ("HEAD /invalid HTTP/1.1\r\n"
+                               "Host: %s:%s\r\n"
+                               "Connection: close\r\n\r\n" % (host, port))
+                    sock.sendall(request.encode("ascii"))
+                    sock.setblocking(False)
+                    selector.register(sock, selectors.EVENT_READ, index)
+                except OSError:
+                    continue
+            pending = len(selector.get_map())
+            while pending:
+                events = selector.select(timeout=5)
+                if not events:
+                    # Anything still pending has not responded in time.
+                    break
+                for key, _events in events:
+                    sock = key.fileobj
+                    index = key.data
+                    try:
+                        chunk = sock.recv(12 - len(buffers[index]))
+                    except OSError:
+                        chunk = b""
+                    data = buffers[index] = buffers[index] + chunk
+                    if chunk and len(data) < 12:
+                        # Partial status line; wait for the rest.
+                        continue
+                    # The reply starts "HTTP/1.x NNN"; twelve bytes cover
+                    # the status code.
+                    results[index] = data[9:12] == b"404"
+                    selector.unregister(sock)
+                    pending -= 1
+        finally:
+            selector.close()
+            for sock in sockets:
+                sock.close()
+        return results
 
 
 class VirtualSensorProtocolPart(ProtocolPart):
     """Protocol part for Sensors"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "virtual_sensor"
 
     @abstractmethod
@@ -1166,8 +1332,7 @@ class VirtualSensorProtocolPart(ProtocolPart):
 
 class DevicePostureProtocolPart(ProtocolPart):
     """Protocol part for Device Posture"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "device_posture"
 
     @abstractmethod
@@ -1180,8 +1345,7 @@ class DevicePostureProtocolPart(ProtocolPart):
 
 class VirtualPressureSourceProtocolPart(ProtocolPart):
     """Protocol part for Virtual Pressure Source"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "pressure"
 
     @abstractmethod
@@ -1198,8 +1362,7 @@ class VirtualPressureSourceProtocolPart(ProtocolPart):
 
 class ProtectedAudienceProtocolPart(ProtocolPart):
     """Protocol part for Protected Audience"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "protected_audience"
 
     @abstractmethod
@@ -1208,8 +1371,7 @@ class ProtectedAudienceProtocolPart(ProtocolPart):
 
 class DisplayFeaturesProtocolPart(ProtocolPart):
     """Protocol part for Display Features/Viewport Segments"""
-    __metaclass__ = ABCMeta
-
+    __slots__ = ()
     name = "display_features"
 
     @abstractmethod